@@ -6,14 +6,15 @@ import os
 import io
 import re
 import csv
+import hashlib
 from pathlib import Path
 from datetime import datetime
+from html import escape
 from typing import Dict, Any, Tuple, Set, List
 
 import streamlit as st
 
 # ---- módulos locais (mantêm sua estrutura) ----
-from app_modules.pdf_utils import extract_text_from_pdf
 from app_modules.analysis import analyze_contract_text, summarize_hits, compute_cet_quick
 from app_modules.stripe_utils import init_stripe, create_checkout_session, verify_checkout_session
 from app_modules.storage import (
@@ -40,6 +41,10 @@ BASE_URL          = st.secrets.get("BASE_URL",          os.getenv("BASE_URL", "h
 
 MONTHLY_PRICE_TEXT = "R$ 9,90/mês"
 
+# Opções dos selects (tuplas fixas, criadas uma vez por processo)
+SETORES = ("Genérico", "SaaS/Serviços", "Empréstimos", "Educação", "Plano de saúde")
+PAPEIS  = ("Contratante", "Contratado", "Outro")
+
 # Hotjar
 HOTJAR_ID = 6519667
 HOTJAR_SV = 6
@@ -51,8 +56,7 @@ CONSULT_CSV = Path("/tmp/consultas.csv")
 # -------------------------------------------------
 # Estilo: home impecável, centralizada e responsiva
 # -------------------------------------------------
-st.markdown(
-    """
+_CSS_HTML = """
     <style>
       :root{
         --text:#0f172a; --muted:#475569; --line:#e5e7eb;
@@ -88,30 +92,43 @@ st.markdown(
       .section{ background:#fff; border:1px solid var(--line); border-radius:16px; padding:18px; }
       .soft{ font-size:13px; color:#64748b; }
 
-      /* evita scroll horizontal em expander */
-      .no-overflow div[role="region"]{ overflow-x: hidden !important; }
+      /* pontos de atenção (<details>); trecho quebra linha, sem scroll horizontal */
+      .hit{ border:1px solid var(--line); border-radius:12px; padding:10px 14px; margin:0 0 8px; background:var(--card); }
+      .hit summary{ cursor:pointer; font-weight:600; color:var(--text); }
+      .hit pre{ white-space:pre-wrap; overflow-wrap:anywhere; max-height:160px; overflow-y:auto;
+        background:var(--bg); border-radius:8px; padding:8px; font-size:13px; }
     </style>
-    """,
-    unsafe_allow_html=True,
-)
+    """
+
+def inject_custom_css():
+    # literal fixo (sem f-string): nada é formatado a cada rerun
+    st.markdown(_CSS_HTML, unsafe_allow_html=True)
+
+inject_custom_css()
 
 # -------------------------------------------------
 # Estado
 # -------------------------------------------------
-if "started" not in st.session_state:
-    st.session_state.started = False
-if "profile" not in st.session_state:
-    st.session_state.profile = {"nome": "", "email": "", "cel": "", "papel": "Contratante"}
-if "premium" not in st.session_state:
-    st.session_state.premium = False
-if "free_runs_left" not in st.session_state:
-    st.session_state.free_runs_left = 1
+# só valores imutáveis aqui; o dict de perfil é criado à parte, apenas se faltar
+_SESSION_DEFAULTS = (("started", False), ("premium", False), ("free_runs_left", 1))
+
+def init_session_state():
+    if st.session_state.get("_initialized"):
+        return
+    for key, value in _SESSION_DEFAULTS:
+        st.session_state.setdefault(key, value)
+    if "profile" not in st.session_state:
+        st.session_state.profile = {"nome": "", "email": "", "cel": "", "papel": "Contratante"}
+    st.session_state["_initialized"] = True
+
+init_session_state()
 
 # -------------------------------------------------
 # Utils / Admin / Validações
 # -------------------------------------------------
 EMAIL_RE = re.compile(r"^[^\s@]+@[^\s@]+\.[^\s@]+$")
 PHONE_RE = re.compile(r"^\+?\d{10,15}$")
+NON_DIGIT_RE = re.compile(r"\D")
 
 def _parse_admin_emails() -> Set[str]:
     raw = st.secrets.get("admin_emails", None)
@@ -132,9 +149,14 @@ def is_valid_email(v: str) -> bool:
     return bool(EMAIL_RE.match((v or "").strip()))
 
 def is_valid_phone(v: str) -> bool:
-    digits = re.sub(r"\D", "", v or "")
+    digits = NON_DIGIT_RE.sub("", v or "")
     return bool(PHONE_RE.match(digits))
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _is_subscriber(email: str) -> bool:
+    # consulta local ao SQLite, compartilhada entre sessões e reaproveitada por 60s
+    return get_subscriber_by_email(email) is not None
+
 def is_premium() -> bool:
     if st.session_state.premium:
         return True
@@ -142,7 +164,7 @@ def is_premium() -> bool:
     if not email:
         return False
     try:
-        if get_subscriber_by_email(email):
+        if _is_subscriber(email):
             st.session_state.premium = True
             return True
     except Exception:
@@ -211,13 +233,20 @@ def log_consultation(payload: Dict[str, Any]):
     with CONSULT_CSV.open("a", newline="", encoding="utf-8") as f:
         csv.writer(f).writerow(row)
 
+@st.cache_data(max_entries=4, show_spinner=False)
+def _csv_bytes(path: str, mtime_ns: int, size: int) -> bytes:
+    # (mtime, tamanho) na chave: só relê o arquivo depois de uma nova linha
+    return Path(path).read_bytes()
+
 def serve_csv_downloads():
-    if VISITS_CSV.exists():
-        with VISITS_CSV.open("rb") as f:
-            st.download_button("📥 Baixar visitas (CSV)", f, file_name="visitas.csv", mime="text/csv")
-    if CONSULT_CSV.exists():
-        with CONSULT_CSV.open("rb") as f:
-            st.download_button("📥 Baixar consultas (CSV)", f, file_name="consultas.csv", mime="text/csv")
+    for path, label, name in ((VISITS_CSV, "📥 Baixar visitas (CSV)", "visitas.csv"),
+                              (CONSULT_CSV, "📥 Baixar consultas (CSV)", "consultas.csv")):
+        try:
+            stt = path.stat()
+        except FileNotFoundError:
+            continue
+        st.download_button(label, _csv_bytes(str(path), stt.st_mtime_ns, stt.st_size),
+                           file_name=name, mime="text/csv")
 
 # -------------------------------------------------
 # Boot (Stripe + DB)
@@ -243,18 +272,18 @@ if not ok_boot:
 
 def first_screen():
     inject_hotjar()
-    st.markdown('<div class="page-hero"><div class="wrap">', unsafe_allow_html=True)
-
-    # chip + título + subtítulo
-    st.markdown(f'<span class="chip">CLARA • {VERSION}</span>', unsafe_allow_html=True)
-    st.markdown('<div class="title">Entenda o que você está assinando</div>', unsafe_allow_html=True)
+    # hero (chip + título + subtítulo) num único bloco HTML
     st.markdown(
-        """
-        <div class="subtitle">
-          A CLARA lê seu contrato, explica <b>em palavras simples</b>
-          e mostra o que pode ser <b>problema</b> — como multas altas,
-          travas de cancelamento e responsabilidades exageradas.
-        </div>
+        f"""
+        <div class="page-hero"><div class="wrap">
+          <span class="chip">CLARA • {VERSION}</span>
+          <div class="title">Entenda o que você está assinando</div>
+          <div class="subtitle">
+            A CLARA lê seu contrato, explica <b>em palavras simples</b>
+            e mostra o que pode ser <b>problema</b> — como multas altas,
+            travas de cancelamento e responsabilidades exageradas.
+          </div>
+        </div></div>
         """,
         unsafe_allow_html=True,
     )
@@ -265,18 +294,13 @@ def first_screen():
     with c2:
         if st.button("Iniciar análise do meu contrato", key="btn_start"):
             st.session_state.started = True
-            try: st.cache_data.clear()
-            except Exception: pass
-            try: st.cache_resource.clear()
-            except Exception: pass
             st.rerun()
     st.markdown('</div>', unsafe_allow_html=True)
 
     # pitch alinhada
-    st.markdown("<div style='height:10px;'></div>", unsafe_allow_html=True)
     st.markdown(
         """
-        <div class="pitch">
+        <div class="pitch" style="margin-top:10px;">
           <p><b>Problema real:</b> milhões de brasileiros assinam documentos sem entender por completo.
              A frase “eu li e concordo” virou símbolo dessa crise silenciosa.
              Isso expõe pessoas e empresas a riscos que poderiam ser evitados.</p>
@@ -289,17 +313,17 @@ def first_screen():
     )
 
     # cards de valor
-    st.markdown("<div style='height:16px;'></div>", unsafe_allow_html=True)
-    st.markdown('<div class="cards">', unsafe_allow_html=True)
-    with st.container():
-        st.markdown('<div class="card"><h4>🛡️ Proteção</h4><p>Detecta multas fora da realidade, travas de cancelamento e riscos escondidos.</p></div>', unsafe_allow_html=True)
-    with st.container():
-        st.markdown('<div class="card"><h4>🧩 Linguagem simples</h4><p>Traduz termos como <b>foro</b> (onde um processo corre), <b>LGPD</b> (regras de dados) e <b>rescisão</b> (como encerrar).</p></div>', unsafe_allow_html=True)
-    with st.container():
-        st.markdown('<div class="card"><h4>📈 CET</h4><p>Mostra o custo total de um financiamento (juros + tarifas + taxas) para comparar propostas.</p></div>', unsafe_allow_html=True)
-    st.markdown('</div>', unsafe_allow_html=True)  # /cards
-
-    st.markdown('</div></div>', unsafe_allow_html=True)  # /wrap /page-hero
+    # um único bloco: o grid .cards só funciona se os cards estiverem dentro dele
+    st.markdown(
+        """
+        <div class="cards" style="margin-top:16px;">
+          <div class="card"><h4>🛡️ Proteção</h4><p>Detecta multas fora da realidade, travas de cancelamento e riscos escondidos.</p></div>
+          <div class="card"><h4>🧩 Linguagem simples</h4><p>Traduz termos como <b>foro</b> (onde um processo corre), <b>LGPD</b> (regras de dados) e <b>rescisão</b> (como encerrar).</p></div>
+          <div class="card"><h4>📈 CET</h4><p>Mostra o custo total de um financiamento (juros + tarifas + taxas) para comparar propostas.</p></div>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
 
 # -------------------------------------------------
 # Sidebar — cadastro (opcional) + admin
@@ -310,8 +334,8 @@ def sidebar_profile():
     nome  = st.sidebar.text_input("Nome completo", value=st.session_state.profile.get("nome",""))
     email = st.sidebar.text_input("E-mail",        value=st.session_state.profile.get("email",""))
     cel   = st.sidebar.text_input("Celular",       value=st.session_state.profile.get("cel",""))
-    papel = st.sidebar.selectbox("Você é o contratante?", ["Contratante","Contratado","Outro"],
-                                 index=["Contratante","Contratado","Outro"].index(st.session_state.profile.get("papel","Contratante")))
+    papel = st.sidebar.selectbox("Você é o contratante?", PAPEIS,
+                                 index=PAPEIS.index(st.session_state.profile.get("papel","Contratante")))
 
     if st.sidebar.button("Salvar dados", use_container_width=True):
         errors = []
@@ -326,7 +350,7 @@ def sidebar_profile():
             try: log_visit(email.strip())
             except Exception: pass
             try:
-                if current_email() and get_subscriber_by_email(current_email()):
+                if current_email() and _is_subscriber(current_email()):
                     st.session_state.premium = True
             except Exception:
                 pass
@@ -335,33 +359,41 @@ def sidebar_profile():
     st.sidebar.markdown("---")
     st.sidebar.subheader("Administração")
     if current_email() in ADMIN_EMAILS:
-        if st.sidebar.checkbox("Área administrativa"):
-            st.sidebar.success("Admin ativo")
-            try:
-                subs = list_subscribers()
-                with st.sidebar.expander("👥 Assinantes (Stripe)", expanded=False):
-                    st.write(subs if subs else "Nenhum assinante ainda.")
-            except Exception as e:
-                st.sidebar.error(f"Não foi possível listar assinantes: {e}")
+        with st.sidebar:
+            admin_panel()
 
-            try:
-                visits = read_visits()
-                with st.sidebar.expander("👣 Últimas visitas", expanded=False):
-                    if not visits:
-                        st.write("Sem registros.")
-                    else:
-                        for v in reversed(visits[-50:]):
-                            st.write(f"{v.get('ts_utc','')} — {v.get('email','')}")
-            except Exception as e:
-                st.sidebar.error(f"Não foi possível ler visitas: {e}")
 
-            with st.sidebar.expander("📦 Exportar CSV", expanded=False):
-                serve_csv_downloads()
+@st.fragment
+def admin_panel():
+    # fragmento: abrir a área admin/baixar CSV reroda só este bloco, não a página
+    if st.checkbox("Área administrativa"):
+        st.success("Admin ativo")
+        try:
+            subs = list_subscribers()
+            with st.expander("👥 Assinantes (Stripe)", expanded=False):
+                st.write(subs if subs else "Nenhum assinante ainda.")
+        except Exception as e:
+            st.error(f"Não foi possível listar assinantes: {e}")
+
+        try:
+            visits = read_visits()
+            with st.expander("👣 Últimas visitas", expanded=False):
+                if not visits:
+                    st.write("Sem registros.")
+                else:
+                    # um elemento só, em vez de um st.write por linha
+                    st.text("\n".join(f"{v.get('ts_utc','')} — {v.get('email','')}" for v in visits[:-51:-1]))
+        except Exception as e:
+            st.error(f"Não foi possível ler visitas: {e}")
+
+        with st.expander("📦 Exportar CSV", expanded=False):
+            serve_csv_downloads()
 
 # -------------------------------------------------
 # Preço / Stripe (banner discreto)
 # -------------------------------------------------
 
+@st.fragment
 def pricing_card():
     st.markdown('<div class="section"><div class="section-title" style="font-weight:800;">Plano Premium</div>', unsafe_allow_html=True)
     st.caption(f"{MONTHLY_PRICE_TEXT} • análises ilimitadas • suporte prioritário")
@@ -395,28 +427,56 @@ def pricing_card():
     st.markdown('</div>', unsafe_allow_html=True)
 
 
+@st.cache_data(ttl=3600, show_spinner=False)
+def _verify_checkout(session_id: str) -> Tuple[bool, str, str, str]:
+    """
+    Confirma a sessão no Stripe uma vez por session_id.
+    Devolve (ok, customer_id, e-mail do pagador, nome do pagador).
+    """
+    ok, payload = verify_checkout_session(session_id)
+    if not ok:
+        return False, "", "", ""
+    customer = payload.get("customer") or (payload.get("subscription") or {}).get("customer") or ""
+    # quem pagou vem do Stripe: após o redirect o perfil desta sessão está vazio
+    details = payload.get("customer_details") or {}
+    email = (details.get("email") or payload.get("customer_email") or "").strip().lower()
+    return True, customer, email, details.get("name") or ""
+
+
 def handle_checkout_result():
     qs = st.query_params
     if qs.get("success") == "true" and qs.get("session_id"):
         sid = qs["session_id"]
+        # mesma sessão já confirmada nesta visita: não volta ao Stripe nem ao banco
+        if st.session_state.get("_checkout_verified") == sid:
+            try: st.query_params.clear()
+            except Exception: pass
+            return
         try:
-            ok, payload = verify_checkout_session(sid)
+            ok, customer, payer_email, payer_name = _verify_checkout(sid)
         except Exception as e:
             st.error(f"Não foi possível confirmar o pagamento: {e}")
-            ok, payload = False, {}
+            ok, customer, payer_email, payer_name = False, "", "", ""
 
         if ok:
-            try:
-                log_subscriber(
-                    email=current_email(),
-                    name=st.session_state.profile.get("nome",""),
-                    stripe_customer_id=(payload.get("customer") or (payload.get("subscription") or {}).get("customer") or "")
-                )
-            except Exception:
-                pass
+            # sem e-mail do pagador não grava: a coluna email é UNIQUE
+            if payer_email:
+                try:
+                    log_subscriber(
+                        email=payer_email,
+                        name=payer_name or st.session_state.profile.get("nome",""),
+                        stripe_session_id=sid,
+                        stripe_customer_id=customer,
+                    )
+                    _is_subscriber.clear(payer_email)
+                except Exception:
+                    pass
             st.session_state.premium = True
+            st.session_state._checkout_verified = sid
             st.success("Pagamento confirmado! Premium liberado ✅")
         else:
+            # falha pode ser transitória: não deixa o "não pago" em cache
+            _verify_checkout.clear(sid)
             st.warning("Não conseguimos confirmar essa sessão. Tente novamente.")
         try: st.query_params.clear()
         except Exception: pass
@@ -426,12 +486,18 @@ def handle_checkout_result():
 # -------------------------------------------------
 
 def landing_block():
-    st.markdown('<div class="section">', unsafe_allow_html=True)
-    st.markdown("### O que você recebe")
-    st.write("• Trechos críticos do contrato → **explicados em linguagem simples**.")
-    st.write("• Sinais de alerta (multas altas, travas, riscos): **o que significam** e **como negociar**.")
-    st.write("• **Relatório** para compartilhar com seu time ou advogado(a).")
-    st.markdown('</div>', unsafe_allow_html=True)
+    # um único bloco: a moldura .section só envolve o conteúdo se vier no mesmo HTML
+    st.markdown(
+        """
+        <div class="section">
+          <h3>O que você recebe</h3>
+          <p>• Trechos críticos do contrato → <b>explicados em linguagem simples</b>.</p>
+          <p>• Sinais de alerta (multas altas, travas, riscos): <b>o que significam</b> e <b>como negociar</b>.</p>
+          <p>• <b>Relatório</b> para compartilhar com seu time ou advogado(a).</p>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
 
     st.markdown("")
     pricing_card()
@@ -440,13 +506,24 @@ def landing_block():
 # Upload / Inputs / CET / Resultado
 # -------------------------------------------------
 
+@st.cache_data(show_spinner=False, max_entries=32)
+def _cached_extract(file_bytes: bytes) -> str:
+    # chave = conteúdo do PDF: reruns com o mesmo arquivo não reprocessam
+    from app_modules.pdf_utils import extract_text_from_pdf  # backend de PDF só carrega no 1º upload
+    return extract_text_from_pdf(io.BytesIO(file_bytes))
+
+
 def upload_or_paste_section() -> str:
     st.subheader("1) Envie o contrato")
     f = st.file_uploader("PDF do contrato", type=["pdf"])
     raw = ""
     if f:
-        with st.spinner("Lendo PDF…"):
-            raw = extract_text_from_pdf(f)
+        # mesmo upload (file_id) → reaproveita o texto, sem copiar bytes nem sondar o cache
+        if st.session_state.get("_last_file_id") != f.file_id:
+            with st.spinner("Lendo PDF…"):
+                st.session_state._extracted_text = _cached_extract(f.getvalue())
+            st.session_state._last_file_id = f.file_id
+        raw = st.session_state._extracted_text
     st.markdown("Ou cole o texto abaixo:")
     raw = st.text_area("Texto do contrato", height=220, value=raw or "")
     return raw
@@ -455,30 +532,49 @@ def upload_or_paste_section() -> str:
 def analysis_inputs() -> Dict[str, Any]:
     st.subheader("2) Contexto")
     c1,c2,c3 = st.columns(3)
-    setor = c1.selectbox("Setor", ["Genérico","SaaS/Serviços","Empréstimos","Educação","Plano de saúde"])
-    papel = c2.selectbox("Perfil", ["Contratante","Contratado","Outro"])
+    setor = c1.selectbox("Setor", SETORES)
+    papel = c2.selectbox("Perfil", PAPEIS)
     valor = c3.number_input("Valor máx. (opcional)", min_value=0.0, step=100.0)
     return {"setor":setor, "papel":papel, "limite_valor":valor}
 
 
 def cet_calculator_block():
     with st.expander("📈 Calculadora de CET (opcional)", expanded=False):
-        c1,c2,c3 = st.columns(3)
-        P   = c1.number_input("Valor principal (R$)", min_value=0.0, step=100.0, key="cet_p")
-        i_m = c2.number_input("Juros mensais (%)", min_value=0.0, step=0.1, key="cet_i")
-        n   = c3.number_input("Parcelas (n)", min_value=1, step=1, key="cet_n")
-        fee = st.number_input("Taxas fixas totais (R$)", min_value=0.0, step=10.0, key="cet_fee")
-        if st.button("Calcular CET", key="btn_calc_cet"):
-            cet = compute_cet_quick(P, i_m/100.0, int(n), fee)
-            st.success(f"**CET aproximado:** {cet*100:.2f}% ao mês")
+        _cet_fragment()
 
 
-def _wrap_text_box(label: str, content: str, h: int = 160):
-    """Exibe texto sem scroll horizontal (caixa fixa e somente vertical)."""
-    st.text_area(label, value=content, height=h, disabled=True)
+@st.fragment
+def _cet_fragment():
+    # fragmento: mexer nos campos reroda só este bloco, não a página (nem o resultado)
+    c1,c2,c3 = st.columns(3)
+    P   = c1.number_input("Valor principal (R$)", min_value=0.0, step=100.0, key="cet_p")
+    i_m = c2.number_input("Juros mensais (%)", min_value=0.0, step=0.1, key="cet_i")
+    n   = c3.number_input("Parcelas (n)", min_value=1, step=1, key="cet_n")
+    fee = st.number_input("Taxas fixas totais (R$)", min_value=0.0, step=10.0, key="cet_fee")
+    if P > 0:
+        cet = compute_cet_quick(P, i_m/100.0, int(n), fee)
+        st.success(f"**CET aproximado:** {cet*100:.2f}% ao mês")
+    else:
+        st.caption("Informe o valor principal para ver o CET.")
+
+
+def _render_hit(h: Dict[str, Any]) -> str:
+    """Um ponto de atenção como <details> (HTML escapado; o trecho vem do contrato)."""
+    parts = [
+        f"<details class='hit'><summary>{escape(h['severity'])} • {escape(h['title'])}</summary>",
+        f"<p>{escape(h.get('explanation', ''))}</p>",
+    ]
+    if h.get("suggestion"):
+        parts.append(f"<p><b>Como negociar:</b> {escape(h['suggestion'])}</p>")
+    if h.get("evidence"):
+        # quebras viram &#10;: uma linha em branco encerraria o bloco HTML do markdown
+        trecho = escape(h["evidence"][:800]).replace("\n", "&#10;")
+        parts.append(f"<p class='soft'>Trecho do contrato (referência)</p><pre>{trecho}</pre>")
+    parts.append("</details>")
+    return "".join(parts)
 
 
-def _build_share_email(resumo: str) -> str:
+def _build_share_email(resumo: str, nome: str) -> str:
     return f"""Assunto: Solicitação de revisão de cláusulas contratuais
 
 Olá,
@@ -492,10 +588,46 @@ Poderia avaliar as cláusulas destacadas (multas, reajuste, foro e responsabilid
 Fico à disposição.
 
 Atenciosamente,
-{st.session_state.profile.get('nome') or '—'}
+{nome or '—'}
 """
 
 
+def _build_report(hits: List[Dict[str, Any]], resume: Dict[str, Any], ctx: Dict[str, Any], nome: str, email: str) -> bytes:
+    """Monta o relatório .txt numa única passada (lista + join), já codificado em UTF-8."""
+    parts = [
+        f"{APP_TITLE} {VERSION}\n",
+        f"Usuário: {nome} <{email or 'sem e-mail'}>  •  Papel: {ctx['papel']}\n",
+        f"Setor: {ctx['setor']}  |  Valor máx.: {ctx['limite_valor']}\n\n",
+        f"Resumo: {resume['resumo']} (Gravidade: {resume['gravidade']})\n\n",
+        "Pontos de atenção:\n",
+    ]
+    for h in hits:
+        parts.append(f"- [{h['severity']}] {h['title']} — {h.get('explanation','')}\n")
+        if h.get("suggestion"):
+            parts.append(f"  Como negociar: {h['suggestion']}\n")
+    return "".join(parts).encode("utf-8")
+
+
+# cache compartilhado entre sessões e com nome/e-mail no conteúdo: limitado em
+# tamanho e tempo para não acumular dados pessoais durante a vida do processo
+@st.cache_data(show_spinner=False, max_entries=64, ttl=3600)
+def _build_downloads(hits: List[Dict[str, Any]], resume: Dict[str, Any], ctx: Dict[str, Any],
+                     nome: str, email: str) -> Tuple[bytes, str, bytes]:
+    """Relatório + e-mail num único cálculo em cache: (relatório, e-mail, e-mail codificado)."""
+    email_text = _build_share_email(resume.get("resumo", ""), nome)
+    return _build_report(hits, resume, ctx, nome, email), email_text, email_text.encode("utf-8")
+
+
+@st.cache_data(show_spinner=False, max_entries=128)
+def _run_full_analysis(text_hash: str, ctx_key: Tuple[Tuple[str, Any], ...], _text: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any], Dict[str, Any]]:
+    """
+    Regras + resumo como uma unidade em cache, por (texto, contexto).
+    A chave é o digest do texto; `_text` (prefixo _) não é re-hasheado pelo Streamlit.
+    """
+    hits, meta = analyze_contract_text(_text, dict(ctx_key))
+    return hits, meta, summarize_hits(hits)
+
+
 def results_section(text: str, ctx: Dict[str, Any]):
     st.subheader("4) Resultado")
 
@@ -504,57 +636,42 @@ def results_section(text: str, ctx: Dict[str, Any]):
         return
 
     # Análise gratuita SEM obrigar cadastro
-    if not is_premium() and st.session_state.free_runs_left <= 0:
+    premium = is_premium()  # uma consulta por execução
+    if not premium and st.session_state.free_runs_left <= 0:
         st.info("Você usou sua análise gratuita. **Assine o Premium** para continuar.")
         return
 
     with st.spinner("Analisando…"):
-        hits, meta = analyze_contract_text(text, ctx)
+        text_hash = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        hits, meta, resume = _run_full_analysis(text_hash, tuple(sorted(ctx.items())), text)
 
-    if not is_premium():
+    if not premium:
         st.session_state.free_runs_left -= 1
 
     # logs
     email_for_log = current_email()  # pode estar vazio (grátis sem cadastro)
-    log_analysis_event(email=email_for_log, meta={"setor":ctx["setor"], "papel":ctx["papel"], "len":len(text)})
+    log_analysis_event(email=email_for_log, meta={"setor":ctx["setor"], "papel":ctx["papel"], "len":len(text)})  # só enfileira
     log_consultation({"setor":ctx["setor"], "valor_max":ctx["limite_valor"], "texto_len":len(text)})
 
-    resume = summarize_hits(hits)
     st.success(f"Resumo: {resume['resumo']}")
     st.write(f"Gravidade: **{resume['gravidade']}** | Pontos críticos: **{resume['criticos']}** | Itens analisados: {len(hits)}")
 
     # Pontos
-    st.markdown("<div class='no-overflow'>", unsafe_allow_html=True)
-    for h in hits:
-        with st.expander(f"{h['severity']} • {h['title']}", expanded=False):
-            st.write(h.get("explanation", ""))               # linguagem simples
-            if h.get("suggestion"):
-                st.markdown(f"**Como negociar:** {h['suggestion']}")
-            if h.get("evidence"):
-                # Evita scroll horizontal: caixa de texto somente leitura
-                _wrap_text_box("Trecho do contrato (referência)", h["evidence"][:800])
-    st.markdown("</div>", unsafe_allow_html=True)
+    # todos os pontos num único elemento (em vez de expander + widgets por ponto)
+    st.markdown("".join(_render_hit(h) for h in hits), unsafe_allow_html=True)
 
     cet_calculator_block()
 
     # Relatório .txt
-    buff = io.StringIO()
-    buff.write(f"{APP_TITLE} {VERSION}\n")
-    buff.write(f"Usuário: {st.session_state.profile.get('nome','')} <{email_for_log or 'sem e-mail'}>  •  Papel: {ctx['papel']}\n")
-    buff.write(f"Setor: {ctx['setor']}  |  Valor máx.: {ctx['limite_valor']}\n\n")
-    buff.write(f"Resumo: {resume['resumo']} (Gravidade: {resume['gravidade']})\n\n")
-    buff.write("Pontos de atenção:\n")
-    for h in hits:
-        buff.write(f"- [{h['severity']}] {h['title']} — {h.get('explanation','')}\n")
-        if h.get("suggestion"):
-            buff.write(f"  Como negociar: {h['suggestion']}\n")
-    st.download_button("📥 Baixar relatório (txt)", data=buff.getvalue(), file_name="relatorio_clara.txt", mime="text/plain")
+    report, email_text, email_bytes = _build_downloads(
+        hits, resume, ctx, st.session_state.profile.get("nome", ""), email_for_log
+    )
+    st.download_button("📥 Baixar relatório (txt)", data=report, file_name="relatorio_clara.txt", mime="text/plain")
 
     # Botão para gerar e-mail (copiar/baixar)
     st.markdown("### Gerar e-mail para advogado/contraparte")
-    email_text = _build_share_email(resume.get('resumo', ''))
     st.text_area("Copie e cole:", email_text, height=220)
-    st.download_button("Baixar e-mail (.txt)", data=email_text.encode("utf-8"), file_name="email_para_advogado.txt", mime="text/plain")
+    st.download_button("Baixar e-mail (.txt)", data=email_bytes, file_name="email_para_advogado.txt", mime="text/plain")
 
     # Ações auxiliares
     colA, colB = st.columns(2)
@@ -1,30 +1,60 @@
+from bisect import bisect_right
+from operator import itemgetter
 from typing import List, Dict, Any, Tuple
 from .rules import RULES
 
+# gravidade por nº de pontos críticos: 0 → Baixa, 1–2 → Média, 3+ → Alta
+_GRAVIDADE_LIMIARES = (1, 3)
+_GRAVIDADES = ("Baixa", "Média", "Alta")
+
+# severidade da regra → inteiro, atribuído uma vez ao criar o hit (tabela única)
+SEV_RANK = {"Alto": 2, "Médio": 1, "Baixo": 0}
+_RANK_ALTO = SEV_RANK["Alto"]
+
+def hit_rank(h: Dict[str, Any]) -> int:
+    """Rank do hit: o pré-calculado, ou derivado da severidade se o dict veio de fora."""
+    return h.get("sev_rank", SEV_RANK.get(h.get("severity"), 0))
+
 def analyze_contract_text(text: str, ctx: Dict[str, Any]) -> Tuple[List[Dict[str,Any]], Dict[str,Any]]:
     hits: List[Dict[str,Any]] = []
+    text_lower = text.lower()
     for rule in RULES:
-        for h in rule.check(text, ctx):
+        for h in rule.check(text, ctx, text_lower):
             hits.append({
                 "title": h.title, "severity": h.severity, "explanation": h.explanation,
-                "suggestion": h.suggestion, "evidence": h.evidence
+                "suggestion": h.suggestion, "evidence": h.evidence,
+                "sev_rank": SEV_RANK.get(h.severity, 0)
             })
+    # mais graves primeiro; sort estável mantém a ordem das regras no empate
+    hits.sort(key=itemgetter("sev_rank"), reverse=True)
     return hits, {"length": len(text)}
 
 def summarize_hits(hits: List[Dict[str,Any]]) -> Dict[str,Any]:
     if not hits:
         return {"resumo": "Nenhum ponto crítico encontrado.", "gravidade": "Baixa", "criticos": 0}
-    criticos = sum(1 for h in hits if h["severity"] == "Alto")
-    grav = "Alta" if criticos >= 3 else ("Média" if criticos >= 1 else "Baixa")
+    criticos = sum(1 for h in hits if hit_rank(h) == _RANK_ALTO)
+    grav = _GRAVIDADES[bisect_right(_GRAVIDADE_LIMIARES, criticos)]
     return {"resumo": "Foram encontrados pontos que exigem atenção.", "gravidade": grav, "criticos": criticos}
 
+def _annuity_pv(a: float, x: float, n: int) -> Tuple[float, float]:
+    """Valor presente de n parcelas iguais `a` à taxa x e sua derivada em x (forma fechada)."""
+    if x == 0:
+        return a * n, -a * n * (n + 1) / 2
+    v = (1 + x) ** -n
+    pv = a * (1 - v) / x
+    dpv = a * (n * v / (1 + x) * x - (1 - v)) / (x * x)
+    return pv, dpv
+
 def compute_cet_quick(P: float, i: float, n: int, fee: float) -> float:
     if P <= 0 or n <= 0: return 0.0
     parcela = (P/n) if i == 0 else P * (i * (1 + i) ** n) / ((1 + i) ** n - 1)
     parcela_aj = parcela + (fee / max(1, n))
     x = i if i > 0 else 0.02
+    # Newton sobre a fórmula fechada da anuidade: O(1) por iteração em vez de O(n)
     for _ in range(20):
-        vp = sum(parcela_aj / ((1 + x) ** k) for k in range(1, n+1)) - P
-        d  = sum(-k * parcela_aj / ((1 + x) ** (k+1)) for k in range(1, n+1))
-        x = max(0.0, x - vp / d if d != 0 else x)
+        pv, d = _annuity_pv(parcela_aj, x, n)
+        step = (pv - P) / d if d != 0 else 0.0
+        x = max(0.0, x - step)
+        if abs(step) < 1e-12:
+            break
     return x
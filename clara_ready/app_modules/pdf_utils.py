@@ -1,37 +1,99 @@
 # app_modules/pdf_utils.py
-from typing import BinaryIO
+from typing import BinaryIO, Iterator, List
 from pypdf import PdfReader
+import pypdfium2 as pdfium
+import io
 import re
+import threading
+
+_HYPHEN_BREAK_RE = re.compile(r"-\s*\n\s*")
+_PARA_BREAK_RE = re.compile(r"\n{2,}")
+_LINE_BREAK_RE = re.compile(r"\n+")
+_SPACES_RE = re.compile(r"[ \t]+")
+
+# o pdfium marca "hífen + quebra de linha" com \x02 (às vezes \ufffe) e já
+# remove a quebra: basta apagar o marcador para rejuntar a palavra
+_PDFIUM_HYPHENS = ("\x02", "\ufffe")
+
+# o pdfium não é thread-safe (nem entre documentos diferentes) e o Streamlit
+# roda cada sessão numa thread: todas as chamadas passam por este lock
+_PDFIUM_LOCK = threading.Lock()
+
+# abaixo disso o pdfium provavelmente não achou a camada de texto
+_MIN_TEXT_CHARS = 50
 
 def normalize_contract_text(t: str) -> str:
-    """
+    r"""
     Recompõe parágrafos de PDFs 'picotados':
-    - remove hifenização no fim de linha
+    - remove hifenização no fim de linha (inclusive o marcador \x02 do pdfium)
     - preserva parágrafos (duas quebras)
     - troca quebras únicas por espaço
     - colapsa múltiplos espaços
+
+    >>> normalize_contract_text("pagará mul\x02ta e renovação automá\x02tica")
+    'pagará multa e renovação automática'
+    >>> normalize_contract_text("pagará mul-\nta")
+    'pagará multa'
     """
     if not t:
         return ""
     t = t.replace("\r", "")
+    for m in _PDFIUM_HYPHENS:
+        t = t.replace(m, "")
     # junta palavras quebradas por hífen no fim da linha
-    t = re.sub(r"-\s*\n\s*", "", t)
+    t = _HYPHEN_BREAK_RE.sub("", t)
     # preserva parágrafos: marca \n\n com marcador temporário
-    t = re.sub(r"\n{2,}", "<<<PARA>>>", t)
+    t = _PARA_BREAK_RE.sub("<<<PARA>>>", t)
     # qualquer \n restante vira espaço
-    t = re.sub(r"\n+", " ", t)
+    t = _LINE_BREAK_RE.sub(" ", t)
     # restaura parágrafos
     t = t.replace("<<<PARA>>>", "\n\n")
     # normaliza espaços
-    t = re.sub(r"[ \t]+", " ", t).strip()
+    t = _SPACES_RE.sub(" ", t).strip()
     return t
 
+def _pypdf_pages(data: bytes) -> Iterator[str]:
+    reader = PdfReader(io.BytesIO(data))
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+def _pdfium_pages(data: bytes) -> List[str]:
+    # tudo sob o lock e sem yield: o documento não fica aberto fora dele
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(data)
+        try:
+            pages: List[str] = []
+            for i in range(len(pdf)):
+                page = pdf[i]
+                try:
+                    textpage = page.get_textpage()
+                    try:
+                        pages.append(textpage.get_text_bounded())
+                    finally:
+                        textpage.close()
+                finally:
+                    page.close()
+            return pages
+        finally:
+            pdf.close()
+
 def extract_text_from_pdf(file: BinaryIO) -> str:
-    """Extrai texto de PDFs textuais e já normaliza para leitura."""
+    """
+    Extrai texto de PDFs textuais e já normaliza para leitura.
+    Usa o pdfium (bem mais rápido em PDFs textuais); se ele falhar ou devolver
+    quase nada (< 50 caracteres), roda o pypdf uma vez e fica com o mais longo.
+    """
+    data = file.read()
+    text = ""
     try:
-        reader = PdfReader(file)
-        raw = "\n".join((page.extract_text() or "") for page in reader.pages)
-        return normalize_contract_text(raw)
+        text = normalize_contract_text("\n".join(_pdfium_pages(data)))
     except Exception:
-        return ""
+        pass
+    if len(text) < _MIN_TEXT_CHARS:
+        try:
+            alt = normalize_contract_text("\n".join(_pypdf_pages(data)))
+            text = max(text, alt, key=len)
+        except Exception:
+            pass
+    return text
 
@@ -1,7 +1,7 @@
-from dataclasses import dataclass
-from typing import List, Dict, Any
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple
 
-@dataclass
+@dataclass(slots=True)
 class RuleHit:
     title: str
     severity: str  # "Alto", "Médio", "Baixo"
@@ -9,7 +9,7 @@ class RuleHit:
     suggestion: str = ""
     evidence: str = ""
 
-@dataclass
+@dataclass(slots=True)
 class ContractRule:
     name: str
     description: str
@@ -20,29 +20,38 @@ class ContractRule:
     severity: str = "Médio"
     suggestion: str = ""
     evidence_snippet: bool = True
+    # preenchidos no __post_init__ (slots exigem declarar os atributos)
+    _kw_any: Tuple[str, ...] = field(init=False, repr=False, compare=False, default=())
+    _kw_all: Tuple[str, ...] = field(init=False, repr=False, compare=False, default=())
 
-    def check(self, text: str, ctx: Dict[str, Any]) -> List[RuleHit]:
-        t = text.lower()
+    def __post_init__(self):
+        # palavras-chave normalizadas uma vez, na importação de RULES
+        self._kw_any = tuple(kw.lower() for kw in self.keywords_any)
+        self._kw_all = tuple(kw.lower() for kw in (self.keywords_all or ()))
+
+    def check(self, text: str, ctx: Dict[str, Any], text_lower: Optional[str] = None) -> List[RuleHit]:
         if self.sector != "Genérico" and self.sector != ctx.get("setor", "Genérico"):
             return []
         perfil = ctx.get("papel", "Outro")
         if self.applies_to != "Ambos" and self.applies_to != perfil:
             return []
-        if self.keywords_all:
-            for kw in self.keywords_all:
-                if kw.lower() not in t:
-                    return []
-        if not any(kw.lower() in t for kw in self.keywords_any):
+        # quem roda várias regras passa o texto já em minúsculas (uma cópia só)
+        t = text_lower if text_lower is not None else text.lower()
+        for kw in self._kw_all:
+            if kw not in t:
+                return []
+        # a 1ª palavra-chave encontrada decide o match e também ancora o trecho
+        for kw in self._kw_any:
+            pos = t.find(kw)
+            if pos != -1:
+                break
+        else:
             return []
         evidence = ""
         if self.evidence_snippet:
-            for kw in self.keywords_any:
-                pos = t.find(kw.lower())
-                if pos != -1:
-                    start = max(0, pos - 120)
-                    end = min(len(text), pos + 200)
-                    evidence = text[start:end]
-                    break
+            start = max(0, pos - 120)
+            end = min(len(text), pos + 200)
+            evidence = text[start:end]
         return [RuleHit(
             title=self.name,
             severity=self.severity,
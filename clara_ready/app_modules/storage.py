@@ -1,39 +1,119 @@
-import sqlite3, os
+import sqlite3, os, threading, queue, atexit
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 DB_PATH = os.getenv("CLARA_DB_PATH", "clara.db")
 
+# uma conexão por processo (compartilhada entre sessões/threads do Streamlit);
+# o lock serializa execute+commit para uma escrita não intercalar com outra
+_LOCK = threading.Lock()
+
+@lru_cache(maxsize=None)
+def _conn() -> sqlite3.Connection:
+    return sqlite3.connect(DB_PATH, check_same_thread=False)
+
 def init_db():
-    conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-    cur.execute("""CREATE TABLE IF NOT EXISTS analyses(
-        id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT, meta TEXT, ts TEXT)""")
-    cur.execute("""CREATE TABLE IF NOT EXISTS subscribers(
-        id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT UNIQUE, name TEXT,
-        stripe_session_id TEXT, stripe_customer_id TEXT, ts TEXT)""")
-    conn.commit(); conn.close()
+    with _LOCK:
+        conn = _conn(); cur = conn.cursor()
+        cur.execute("""CREATE TABLE IF NOT EXISTS analyses(
+            id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT, meta TEXT, ts TEXT)""")
+        cur.execute("""CREATE TABLE IF NOT EXISTS subscribers(
+            id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT UNIQUE, name TEXT,
+            stripe_session_id TEXT, stripe_customer_id TEXT, ts TEXT)""")
+        conn.commit()
+
+# eventos de análise vão para uma fila; uma thread daemon grava em lotes
+# (executemany + 1 commit), fora do caminho de renderização
+_EVENTS: "queue.Queue[tuple]" = queue.Queue()
+_BATCH_MAX = 64
+_FLUSH_WAIT = 0.5
+_STOP = object()  # sentinela de saída: a thread grava o lote em mãos e encerra
+
+def _write_events(rows: List[tuple]):
+    with _LOCK:
+        conn = _conn()
+        conn.executemany("INSERT INTO analyses(email, meta, ts) VALUES(?,?,?)", rows)
+        conn.commit()
+
+def _drain(timeout: Optional[float]) -> List[tuple]:
+    """Tira até _BATCH_MAX eventos da fila; se achar a sentinela, ela vem por último."""
+    rows: List[tuple] = []
+    try:
+        rows.append(_EVENTS.get(timeout=timeout) if timeout else _EVENTS.get_nowait())
+        while len(rows) < _BATCH_MAX and rows[-1] is not _STOP:
+            rows.append(_EVENTS.get_nowait())
+    except queue.Empty:
+        pass
+    return rows
+
+def _flush_loop():
+    while True:
+        rows = _drain(_FLUSH_WAIT)
+        stop = bool(rows) and rows[-1] is _STOP
+        if stop:
+            rows.pop()
+        if rows:
+            try:
+                _write_events(rows)
+            except Exception:
+                pass  # log é best-effort: não derruba a thread
+        if stop:
+            return
+
+# check-then-start sob lock: no máximo uma thread, mesmo com sessões logando juntas
+_FLUSHER: Optional[threading.Thread] = None
+_FLUSHER_LOCK = threading.Lock()
+
+def _flusher() -> threading.Thread:
+    global _FLUSHER
+    if _FLUSHER is None:
+        with _FLUSHER_LOCK:
+            if _FLUSHER is None:
+                t = threading.Thread(target=_flush_loop, name="clara-log-flush", daemon=True)
+                t.start()
+                _FLUSHER = t
+    return _FLUSHER
+
+def flush_events():
+    """Grava imediatamente o que estiver na fila."""
+    while True:
+        rows = [r for r in _drain(None) if r is not _STOP]
+        if not rows:
+            return
+        _write_events(rows)
+
+def _shutdown():
+    # a thread pode estar com um lote fora da fila: pede para ela parar e espera
+    # o commit desse lote antes de o interpretador matar a daemon
+    with _FLUSHER_LOCK:
+        t = _FLUSHER
+    if t is not None:
+        _EVENTS.put(_STOP)
+        t.join(timeout=5)
+    flush_events()
+
+atexit.register(_shutdown)
 
 def log_analysis_event(email: str, meta: Dict[str,Any]):
-    conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-    cur.execute("INSERT INTO analyses(email, meta, ts) VALUES(?,?,?)",
-                (email, str(meta), datetime.utcnow().isoformat()))
-    conn.commit(); conn.close()
+    """Enfileira o evento e retorna na hora; a gravação acontece em lote."""
+    _flusher()
+    _EVENTS.put_nowait((email, str(meta), datetime.utcnow().isoformat()))
 
 def log_subscriber(email: str, name: str, stripe_session_id: str, stripe_customer_id: str):
-    conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-    cur.execute("""INSERT OR REPLACE INTO subscribers(email, name, stripe_session_id, stripe_customer_id, ts)
-                   VALUES(?,?,?,?,?)""",
-                (email, name, stripe_session_id, stripe_customer_id, datetime.utcnow().isoformat()))
-    conn.commit(); conn.close()
+    with _LOCK:
+        conn = _conn()
+        conn.execute("""INSERT OR REPLACE INTO subscribers(email, name, stripe_session_id, stripe_customer_id, ts)
+                        VALUES(?,?,?,?,?)""",
+                     (email, name, stripe_session_id, stripe_customer_id, datetime.utcnow().isoformat()))
+        conn.commit()
 
 def list_subscribers() -> List[Dict[str,Any]]:
-    conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-    cur.execute("SELECT email, name, stripe_customer_id, ts FROM subscribers ORDER BY ts DESC")
-    rows = cur.fetchall(); conn.close()
+    with _LOCK:
+        rows = _conn().execute("SELECT email, name, stripe_customer_id, ts FROM subscribers ORDER BY ts DESC").fetchall()
     return [{"email": r[0], "name": r[1], "stripe_customer_id": r[2], "created_at": r[3]} for r in rows]
 
 def get_subscriber_by_email(email: str) -> Optional[Dict[str,Any]]:
-    conn = sqlite3.connect(DB_PATH); cur = conn.cursor()
-    cur.execute("SELECT email, name, stripe_customer_id FROM subscribers WHERE email=?", (email,))
-    row = cur.fetchone(); conn.close()
+    with _LOCK:
+        row = _conn().execute("SELECT email, name, stripe_customer_id FROM subscribers WHERE email=?", (email,)).fetchone()
     return {"email": row[0], "name": row[1], "stripe_customer_id": row[2]} if row else None
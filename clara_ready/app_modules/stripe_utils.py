@@ -1,20 +1,25 @@
 # app_modules/stripe_utils.py
+from functools import lru_cache
 from typing import Tuple, Dict, Any
-import stripe
-import os
 
 _ready = False
+_secret_key = ""
 
 def init_stripe(secret_key: str) -> None:
-    global _ready
+    global _ready, _secret_key
     if not secret_key:
         _ready = False
         return
-    stripe.api_key = secret_key
+    _secret_key = secret_key
+    _stripe.cache_clear()
     _ready = True
 
-# no topo do arquivo garanta:
-import stripe
+@lru_cache(maxsize=None)
+def _stripe():
+    """SDK do Stripe importado só no primeiro uso (checkout/verificação), já com a chave."""
+    import stripe
+    stripe.api_key = _secret_key
+    return stripe
 
 def create_checkout_session(
     *, price_id: str, customer_email: str, success_url: str, cancel_url: str
@@ -23,8 +28,6 @@ def create_checkout_session(
     Cria sessão do Checkout (assinatura mensal). Retorna {"id":..., "url":...}
     ou {"error": "..."} com a mensagem real do Stripe.
     """
-    # Se você usa um flag interno como _ready, mantenha-o;
-    # caso não exista, remova a checagem abaixo.
     try:
         # validação básica
         if not price_id:
@@ -34,6 +37,7 @@ def create_checkout_session(
         if not success_url or "{CHECKOUT_SESSION_ID}" not in success_url:
             return {"error": "success_url deve conter {CHECKOUT_SESSION_ID}."}
 
+        stripe = _stripe()  # import/SDK dentro do try: falha vira {"error": ...}
         sess = stripe.checkout.Session.create(
             mode="subscription",                             # assinatura mensal
             line_items=[{"price": price_id, "quantity": 1}],
@@ -47,15 +51,13 @@ def create_checkout_session(
         )
         return {"id": sess.id, "url": sess.url}
 
-    except stripe.error.StripeError as e:
-        # Mostra a causa real (ex.: “No such price…”, “You cannot use a live key with a test price”, etc.)
+    except Exception as e:
+        # Erros do Stripe trazem a causa real em user_message (ex.: “No such price…”,
+        # “You cannot use a live key with a test price”); outras falhas (import do SDK,
+        # rede, URL inválida) vão com a mensagem da exceção
         msg = getattr(e, "user_message", "") or str(e)
         return {"error": msg}
 
-    except Exception as e:
-        # Outras falhas (ex.: rede, URL inválida)
-        return {"error": str(e)}
-
 
 def verify_checkout_session(session_id: str) -> Tuple[bool, Dict[str, Any]]:
     """
@@ -64,7 +66,7 @@ def verify_checkout_session(session_id: str) -> Tuple[bool, Dict[str, Any]]:
     if not _ready or not session_id:
         return False, {}
     try:
-        s = stripe.checkout.Session.retrieve(session_id, expand=["subscription"])
+        s = _stripe().checkout.Session.retrieve(session_id, expand=["subscription"])
         paid = (s.get("payment_status") == "paid") or \
                (s.get("status") in ("complete", "open") and bool(s.get("subscription")))
         return bool(paid), s